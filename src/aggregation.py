@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from data_loading import annual_rows, financial_year, load_breakdown
+
+PER = 100000
+_CACHE = {}
+
+
+def poisson_ci(observed, alpha=0.05, method="exact"):
+    """Vectorised confidence limits for Poisson counts.
+
+    method="exact" uses the chi-squared (Garwood) limits, method="byar" uses
+    Byar's approximation as in PHE fingertips tools.
+    """
+    o = np.asarray(observed, dtype=float)
+    if method == "exact":
+        lower = np.where(o > 0, stats.chi2.ppf(alpha / 2, 2 * o) / 2, 0.0)
+        upper = stats.chi2.ppf(1 - alpha / 2, 2 * (o + 1)) / 2
+    elif method == "byar":
+        z = stats.norm.ppf(1 - alpha / 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lower = np.where(
+                o > 0,
+                o * (1 - 1 / (9 * o) - z / (3 * np.sqrt(o))) ** 3,
+                0.0,
+            )
+        o1 = o + 1
+        upper = o1 * (1 - 1 / (9 * o1) + z / (3 * np.sqrt(o1))) ** 3
+    else:
+        raise ValueError(f"Unknown CI method: {method}")
+    return lower, upper
+
+
+def mapping_frame(mapping):
+    """Accept a dict or a two-column frame and return level_description/group."""
+    if isinstance(mapping, dict):
+        mapping = pd.DataFrame(
+            list(mapping.items()), columns=["level_description", "group"]
+        )
+    if not {"level_description", "group"} <= set(mapping.columns):
+        if len(mapping.columns) != 2:
+            raise ValueError(
+                "Mapping needs level_description and group columns, "
+                f"got {list(mapping.columns)}"
+            )
+        # Unnamed two-column mapping: area first, group second.
+        mapping = mapping.set_axis(["level_description", "group"], axis=1)
+    mapping = mapping[["level_description", "group"]].copy()
+    mapping["level_description"] = mapping["level_description"].str.strip().str.lower()
+    return mapping.drop_duplicates()
+
+
+def aggregate(df, mapping, alpha=0.05, method="exact"):
+    """Rates and CIs for custom groups of areas.
+
+    df must hold one row per year/area (see data_loading.annual_rows). Observed
+    and population are summed per year/group in a single groupby and the crude
+    rate per 100,000 and its CI are derived from the sums. The published
+    (standardised) indicator values are combined as a population-weighted mean.
+    """
+    mapping = mapping_frame(mapping)
+    merged = df.merge(mapping, on="level_description", how="inner")
+    if merged.empty:
+        raise ValueError("Mapping matched no areas in the data")
+    merged["weighted_value"] = merged["indicator_value"] * merged["population"]
+
+    out = (
+        merged.groupby(["year_start", "group"])
+        .agg(
+            observed=("observed", "sum"),
+            population=("population", "sum"),
+            weighted_value=("weighted_value", "sum"),
+            n_areas=("level_description", "nunique"),
+        )
+        .reset_index()
+    )
+    lower, upper = poisson_ci(out["observed"], alpha=alpha, method=method)
+    out["rate"] = out["observed"] / out["population"] * PER
+    out["lower_ci"] = lower / out["population"] * PER
+    out["upper_ci"] = upper / out["population"] * PER
+    out["indicator_value"] = out["weighted_value"] / out["population"]
+    out["financial_year"] = financial_year(out["year_start"])
+    return out.drop(columns="weighted_value")[
+        [
+            "year_start",
+            "financial_year",
+            "group",
+            "rate",
+            "lower_ci",
+            "upper_ci",
+            "indicator_value",
+            "observed",
+            "population",
+            "n_areas",
+        ]
+    ]
+
+
+def aggregate_breakdown(breakdown, mapping, alpha=0.05, method="exact"):
+    """Memoised aggregate() over a processed breakdown file."""
+    mapping = mapping_frame(mapping)
+    key = (
+        breakdown,
+        tuple(map(tuple, mapping.sort_values(["level_description", "group"]).values)),
+        alpha,
+        method,
+    )
+    if key not in _CACHE:
+        df = annual_rows(load_breakdown(breakdown))
+        _CACHE[key] = aggregate(df, mapping, alpha=alpha, method=method)
+    return _CACHE[key].copy()
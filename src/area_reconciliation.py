@@ -0,0 +1,227 @@
+import difflib
+import os
+
+import pandas as pd
+
+from data_loading import (
+    PROCESSED_DIR,
+    annual_rows,
+    financial_year,
+    load_breakdown,
+)
+
+# KNOWN BOUNDARY CHANGES (2003/04–2023/24)
+# Predecessor -> successor for merges and renames. Chains are followed, so
+# taunton deane -> somerset west and taunton -> somerset.
+KNOWN_SUCCESSORS = {
+    # 2018 rename
+    "shepway": "folkestone and hythe",
+    # 2019 Dorset / BCP
+    "bournemouth": "bournemouth, christchurch and poole",
+    "christchurch": "bournemouth, christchurch and poole",
+    "poole": "bournemouth, christchurch and poole",
+    "east dorset": "dorset",
+    "north dorset": "dorset",
+    "purbeck": "dorset",
+    "west dorset": "dorset",
+    "weymouth and portland": "dorset",
+    # 2019 Suffolk
+    "suffolk coastal": "east suffolk",
+    "waveney": "east suffolk",
+    "forest heath": "west suffolk",
+    "st edmundsbury": "west suffolk",
+    # 2019 / 2023 Somerset
+    "taunton deane": "somerset west and taunton",
+    "west somerset": "somerset west and taunton",
+    "somerset west and taunton": "somerset",
+    "mendip": "somerset",
+    "sedgemoor": "somerset",
+    "south somerset": "somerset",
+    # 2020 Buckinghamshire
+    "aylesbury vale": "buckinghamshire",
+    "chiltern": "buckinghamshire",
+    "south bucks": "buckinghamshire",
+    "wycombe": "buckinghamshire",
+    # 2021 Northamptonshire
+    "corby": "north northamptonshire",
+    "east northamptonshire": "north northamptonshire",
+    "kettering": "north northamptonshire",
+    "wellingborough": "north northamptonshire",
+    "daventry": "west northamptonshire",
+    "northampton": "west northamptonshire",
+    "south northamptonshire": "west northamptonshire",
+    # 2023 Cumbria
+    "allerdale": "cumberland",
+    "carlisle": "cumberland",
+    "copeland": "cumberland",
+    "barrow-in-furness": "westmorland and furness",
+    "eden": "westmorland and furness",
+    "south lakeland": "westmorland and furness",
+    # 2023 North Yorkshire
+    "craven": "north yorkshire",
+    "hambleton": "north yorkshire",
+    "harrogate": "north yorkshire",
+    "richmondshire": "north yorkshire",
+    "ryedale": "north yorkshire",
+    "scarborough": "north yorkshire",
+    "selby": "north yorkshire",
+}
+
+# Upper tier areas that were split rather than merged. Their counts are
+# apportioned to the successors by population share.
+KNOWN_SPLITS = {
+    "cumbria": ["cumberland", "westmorland and furness"],
+    "northamptonshire": ["north northamptonshire", "west northamptonshire"],
+}
+
+FUZZY_CUTOFF = 0.9
+
+
+def normalise_names(names):
+    """Vectorised name normalisation used for matching only."""
+    return (
+        pd.Series(names, dtype="object")
+        .astype(str)
+        .str.lower()
+        .str.replace("&", " and ", regex=False)
+        .str.replace(r"\bst\.?\s", "st ", regex=True)
+        .str.replace(r"[^a-z0-9 ]", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def _resolve_successor(name, current):
+    seen = set()
+    while name in KNOWN_SUCCESSORS and name not in current and name not in seen:
+        seen.add(name)
+        name = KNOWN_SUCCESSORS[name]
+    return name
+
+
+def _split_weights(df, current):
+    """Population share of each split successor in its first reported year."""
+    rows = []
+    annual = annual_rows(df)
+    for predecessor, successors in KNOWN_SPLITS.items():
+        if predecessor not in set(df["level_description"]):
+            continue
+        successors = [s for s in successors if s in current]
+        if not successors:
+            continue
+        first = annual[annual["level_description"].isin(successors)]
+        first = first[first["year_start"] == first["year_start"].min()]
+        shares = first.set_index("level_description")["population"]
+        shares = shares / shares.sum()
+        for successor, share in shares.items():
+            rows.append((predecessor, successor, "split", share))
+    return rows
+
+
+def build_crosswalk(df):
+    """Map every area name in df onto the geographies of the latest year."""
+    latest = df["year_start"].max()
+    current = set(df.loc[df["year_start"] == latest, "level_description"])
+    current_norm = dict(zip(normalise_names(sorted(current)), sorted(current)))
+
+    names = pd.Series(sorted(df["level_description"].unique()))
+    norm = normalise_names(names)
+
+    rows = []
+    split_rows = _split_weights(df, current)
+    split_names = {r[0] for r in split_rows}
+    rows.extend(split_rows)
+    for name, key in zip(names, norm):
+        if name in split_names:
+            continue
+        if name in current:
+            rows.append((name, name, "exact", 1.0))
+            continue
+        successor = _resolve_successor(name, current)
+        if successor in current:
+            rows.append((name, successor, "known", 1.0))
+            continue
+        if key in current_norm:
+            rows.append((name, current_norm[key], "normalised", 1.0))
+            continue
+        match = difflib.get_close_matches(key, current_norm, n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            rows.append((name, current_norm[match[0]], "fuzzy", 1.0))
+        else:
+            rows.append((name, name, "unmatched", 1.0))
+
+    return pd.DataFrame(
+        rows, columns=["level_description", "current_area", "match_type", "weight"]
+    ).sort_values(["current_area", "level_description"], ignore_index=True)
+
+
+def load_crosswalk(breakdown, df=None, refresh=False):
+    """Return the cached crosswalk for a breakdown, building it if needed."""
+    path = f"{PROCESSED_DIR}/{breakdown}_crosswalk.csv"
+    if df is None:
+        df = load_breakdown(breakdown)
+    if os.path.exists(path) and not refresh:
+        crosswalk = pd.read_csv(path)
+        if set(df["level_description"]) <= set(crosswalk["level_description"]):
+            return crosswalk
+    crosswalk = build_crosswalk(df)
+    crosswalk.to_csv(path, index=False)
+    return crosswalk
+
+
+def reconcile(df, crosswalk):
+    """Aggregate predecessor areas onto current geographies.
+
+    Observed and population are summed (scaled by the crosswalk weight) and
+    the indicator value is the population-weighted mean of the predecessors.
+    """
+    merged = df.merge(crosswalk, on="level_description", how="inner")
+    merged["observed"] = merged["observed"] * merged["weight"]
+    merged["population"] = merged["population"] * merged["weight"]
+    merged["weighted_value"] = merged["indicator_value"] * merged["population"]
+
+    out = (
+        merged.groupby(["year_start", "current_area"])
+        .agg(
+            observed=("observed", "sum"),
+            population=("population", "sum"),
+            weighted_value=("weighted_value", "sum"),
+            n_predecessors=("level_description", "nunique"),
+        )
+        .reset_index()
+        .rename(columns={"current_area": "level_description"})
+    )
+    out["indicator_value"] = out["weighted_value"] / out["population"]
+    out["financial_year"] = financial_year(out["year_start"])
+    return out.drop(columns="weighted_value")[
+        [
+            "year_start",
+            "financial_year",
+            "level_description",
+            "indicator_value",
+            "observed",
+            "population",
+            "n_predecessors",
+        ]
+    ]
+
+
+def consistent_series(breakdown, refresh=False):
+    """Annual series for a local authority breakdown on current boundaries."""
+    df = load_breakdown(breakdown)
+    crosswalk = load_crosswalk(breakdown, df, refresh=refresh)
+    return reconcile(annual_rows(df), crosswalk)
+
+
+if __name__ == "__main__":
+    for breakdown in ["lower_tier_local_authority", "upper_tier_local_authority"]:
+        crosswalk = load_crosswalk(breakdown, refresh=True)
+        series = consistent_series(breakdown)
+        print(breakdown)
+        print(crosswalk["match_type"].value_counts().to_string())
+        print(
+            f"{series['level_description'].nunique()} current areas, "
+            f"{series.groupby('level_description').size().min()} to "
+            f"{series.groupby('level_description').size().max()} years each"
+        )
+        series.to_csv(f"{PROCESSED_DIR}/{breakdown}_reconciled.csv", index=False)
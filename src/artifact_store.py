@@ -0,0 +1,278 @@
+import hashlib
+import io
+import json
+import os
+import platform
+import time
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+ARTIFACT_DIR = "../artifacts"
+LIBRARIES = ["pandas", "numpy", "scipy", "scikit-learn", "statsmodels", "prophet"]
+
+
+def library_versions():
+    versions = {"python": platform.python_version()}
+    for lib in LIBRARIES:
+        try:
+            versions[lib] = metadata.version(lib)
+        except metadata.PackageNotFoundError:
+            versions[lib] = None
+    return versions
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    with open(path, "rb") as f:
+        return hash_bytes(f.read())
+
+
+def _canonical(obj):
+    return json.dumps(obj, sort_keys=True, default=str).encode()
+
+
+# CONTENT-ADDRESSED OBJECTS
+def _object_path(digest):
+    return f"{ARTIFACT_DIR}/objects/{digest[:2]}/{digest}"
+
+
+def put(data):
+    digest = hash_bytes(data)
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    return digest
+
+
+def get(digest):
+    with open(_object_path(digest), "rb") as f:
+        return f.read()
+
+
+def put_frame(df):
+    return put(df.to_csv(index=False).encode())
+
+
+def get_frame(digest):
+    return pd.read_csv(io.BytesIO(get(digest)))
+
+
+# CACHED STEPS AND RUN MANIFESTS
+class Run:
+    """Collects the steps of one pipeline run and writes its manifest.
+
+    Each step is keyed by its name, input file hashes, parameters, the source
+    hashes of the modules its compute function depends on and library
+    versions. If the same key was computed before and its outputs are still in
+    the store, they are loaded instead of recomputed. Outputs with a true
+    timed_out value depend on machine load, so they are stored and recorded
+    in the manifest but never indexed for reuse.
+    """
+
+    def __init__(self, name="run"):
+        self.name = name
+        self.steps = []
+        self.metrics = {}
+        self.versions = library_versions()
+
+    def step(self, name, input_paths, params, compute, modules):
+        inputs = {os.path.basename(p): hash_file(p) for p in input_paths}
+        code = {m.__name__: hash_file(m.__file__) for m in modules}
+        key = hash_bytes(
+            _canonical(
+                {
+                    "step": name,
+                    "inputs": inputs,
+                    "params": params,
+                    "code": code,
+                    "versions": self.versions,
+                }
+            )
+        )
+        index_path = f"{ARTIFACT_DIR}/steps/{key}.json"
+
+        cached = False
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                output_hashes = json.load(f)
+            if all(os.path.exists(_object_path(h)) for h in output_hashes.values()):
+                outputs = {n: get_frame(h) for n, h in output_hashes.items()}
+                cached = True
+        timed_out = False
+        if not cached:
+            outputs = compute()
+            output_hashes = {n: put_frame(df) for n, df in outputs.items()}
+            timed_out = any(
+                "timed_out" in df.columns and df["timed_out"].any()
+                for df in outputs.values()
+            )
+            if not timed_out:
+                os.makedirs(os.path.dirname(index_path), exist_ok=True)
+                with open(index_path, "w") as f:
+                    json.dump(output_hashes, f, indent=2)
+
+        self.steps.append(
+            {
+                "step": name,
+                "key": key,
+                "cached": cached,
+                "timed_out": timed_out,
+                "inputs": inputs,
+                "params": params,
+                "code": code,
+                "outputs": output_hashes,
+            }
+        )
+        return outputs
+
+    def save(self):
+        manifest = {
+            "name": self.name,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "versions": self.versions,
+            "steps": self.steps,
+            "metrics": self.metrics,
+        }
+        run_key = hash_bytes(_canonical([s["key"] for s in self.steps]))
+        manifest["run_id"] = f"{time.strftime('%Y%m%d-%H%M%S')}-{run_key[:8]}"
+        os.makedirs(f"{ARTIFACT_DIR}/runs", exist_ok=True)
+        with open(f"{ARTIFACT_DIR}/runs/{manifest['run_id']}.json", "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        return manifest["run_id"]
+
+
+def list_runs():
+    if not os.path.isdir(f"{ARTIFACT_DIR}/runs"):
+        return []
+    return sorted(f[:-5] for f in os.listdir(f"{ARTIFACT_DIR}/runs"))
+
+
+def load_manifest(run_id):
+    """Load a manifest by id, unique id prefix, or "latest"/"previous"."""
+    runs = list_runs()
+    if run_id in ("latest", "previous"):
+        matches = runs[-1:] if run_id == "latest" else runs[-2:-1]
+    else:
+        matches = [r for r in runs if r.startswith(run_id)]
+    if len(matches) != 1:
+        raise ValueError(f"No unique run matches {run_id!r}")
+    with open(f"{ARTIFACT_DIR}/runs/{matches[0]}.json") as f:
+        return json.load(f)
+
+
+def _outputs(manifest):
+    return {
+        f"{s['step']}/{name}": digest
+        for s in manifest["steps"]
+        for name, digest in s["outputs"].items()
+    }
+
+
+def _frame_diff(a, b):
+    """Rows changed and largest numeric change between two output frames.
+
+    Rows are matched on the identifier columns both frames share (text and
+    integer columns other than the selected model); frames without any are
+    compared row by row.
+    """
+    keys = [
+        c
+        for c in a.columns
+        if c in b.columns
+        and c != "model"
+        and not pd.api.types.is_float_dtype(a[c])
+        and not pd.api.types.is_bool_dtype(a[c])
+    ]
+    if keys:
+        merged = a.merge(b, on=keys, how="outer", suffixes=("_a", "_b"), indicator=True)
+        unmatched = (merged["_merge"] != "both").values
+    else:
+        n = max(len(a), len(b))
+        merged = (
+            a.reset_index(drop=True)
+            .add_suffix("_a")
+            .reindex(range(n))
+            .join(b.reset_index(drop=True).add_suffix("_b").reindex(range(n)))
+        )
+        unmatched = np.arange(n) >= min(len(a), len(b))
+    values = [c for c in a.columns if c not in keys and c in b.columns]
+    numeric = [
+        c
+        for c in values
+        if pd.api.types.is_numeric_dtype(a[c])
+        and pd.api.types.is_numeric_dtype(b[c])
+        and not pd.api.types.is_bool_dtype(a[c])
+    ]
+    delta = np.column_stack(
+        [(merged[f"{c}_b"] - merged[f"{c}_a"]).abs().values for c in numeric]
+        or [np.zeros(len(merged))]
+    )
+    relabelled = np.column_stack(
+        [
+            (merged[f"{c}_b"] != merged[f"{c}_a"]).values
+            for c in values
+            if c not in numeric
+        ]
+        or [np.zeros(len(merged), dtype=bool)]
+    )
+    changed = (
+        unmatched | (np.nan_to_num(delta) > 1e-9).any(axis=1) | relabelled.any(axis=1)
+    )
+    return int(changed.sum()), float(np.nanmax(delta)) if delta.size else 0.0
+
+
+def diff_runs(run_a, run_b):
+    """Compare two runs from their manifests and stored outputs only."""
+    a, b = load_manifest(run_a), load_manifest(run_b)
+    out_a, out_b = _outputs(a), _outputs(b)
+
+    rows = []
+    for name in sorted(set(out_a) | set(out_b)):
+        if name not in out_a or name not in out_b:
+            status = "added" if name in out_b else "removed"
+            rows.append({"output": name, "status": status})
+        elif out_a[name] == out_b[name]:
+            rows.append({"output": name, "status": "same", "rows_changed": 0})
+        else:
+            n, biggest = _frame_diff(get_frame(out_a[name]), get_frame(out_b[name]))
+            rows.append(
+                {
+                    "output": name,
+                    "status": "changed",
+                    "rows_changed": n,
+                    "max_abs_diff": biggest,
+                }
+            )
+    steps_a = {s["step"]: s for s in a["steps"]}
+    steps_b = {s["step"]: s for s in b["steps"]}
+    for step in sorted(set(steps_a) & set(steps_b)):
+        for field in ("inputs", "params", "code"):
+            va, vb = steps_a[step].get(field, {}), steps_b[step].get(field, {})
+            for k in sorted(set(va) | set(vb)):
+                if va.get(k) != vb.get(k):
+                    rows.append(
+                        {
+                            "output": f"{step}/{field}/{k}",
+                            "status": "changed",
+                            "a": va.get(k),
+                            "b": vb.get(k),
+                        }
+                    )
+    for metric in sorted(set(a["metrics"]) | set(b["metrics"])):
+        va, vb = a["metrics"].get(metric), b["metrics"].get(metric)
+        rows.append(
+            {
+                "output": f"metric/{metric}",
+                "status": "same" if va == vb else "changed",
+                "a": va,
+                "b": vb,
+            }
+        )
+    return pd.DataFrame(rows)
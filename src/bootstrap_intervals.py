@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+import model_zoo
+
+DEFAULT_QUANTILES = (0.025, 0.975)
+
+
+def to_matrix(df, group_col="level_description", value_col="indicator_value"):
+    """Pivot a long frame into an (n_series, n_years) array, NaN where missing."""
+    wide = df.pivot_table(
+        index=group_col, columns="year_start", values=value_col, aggfunc="first"
+    ).sort_index(axis=1)
+    return wide.index, wide.columns.values, wide.values.astype(float)
+
+
+def step_residuals(values):
+    """Centred year-on-year changes for every series at once.
+
+    These are the one-step residuals of a drift model. Missing years give NaN
+    residuals, which are pushed to the end of each row; the number of usable
+    residuals per series is returned alongside (zero for single-year series).
+    """
+    diffs = np.diff(values, axis=1)
+    n_valid = (~np.isnan(diffs)).sum(axis=1)
+    mean = np.nansum(diffs, axis=1, keepdims=True) / np.maximum(n_valid, 1)[:, None]
+    diffs = diffs - mean
+    order = np.argsort(np.isnan(diffs), axis=1, kind="stable")
+    diffs = np.take_along_axis(diffs, order, axis=1)
+    return diffs, n_valid
+
+
+def simulate_paths(values, point_forecasts, n_sims=5000, seed=0):
+    """Simulated future paths of shape (n_series, n_sims, horizon).
+
+    The residuals are those of a drift model whatever model produced the
+    point forecast: the bands assume forecast errors behave like a random
+    walk around the point forecast, which is conservative for trend models
+    fitted to smooth series. Resampled residuals are accumulated along the
+    horizon so bands widen with lead time, and paths are floored at zero
+    because admission rates cannot be negative. Column j of point_forecasts
+    must be step j + 1 after each series' own last observed year. Series
+    with no residuals (a single year of history) get NaN paths.
+    """
+    rng = np.random.default_rng(seed)
+    residuals, n_valid = step_residuals(values)
+    n_series, horizon = point_forecasts.shape
+    if residuals.shape[1] == 0:
+        return np.full((n_series, n_sims, horizon), np.nan)
+    u = rng.random((n_series, n_sims, horizon))
+    idx = (u * np.maximum(n_valid, 1)[:, None, None]).astype(int)
+    draws = np.nan_to_num(residuals[np.arange(n_series)[:, None, None], idx])
+    paths = np.maximum(point_forecasts[:, None, :] + np.cumsum(draws, axis=2), 0)
+    paths[n_valid == 0] = np.nan
+    return paths
+
+
+def bootstrap_intervals(
+    values, point_forecasts, quantiles=DEFAULT_QUANTILES, n_sims=5000, seed=0
+):
+    """Quantiles of the simulated paths, shape (len(quantiles), n_series, horizon)."""
+    paths = simulate_paths(values, point_forecasts, n_sims=n_sims, seed=seed)
+    return np.quantile(paths, quantiles, axis=1)
+
+
+def batch_intervals(
+    df,
+    forecasts,
+    group_col="level_description",
+    quantiles=DEFAULT_QUANTILES,
+    n_sims=5000,
+    seed=0,
+):
+    """Add bootstrap interval columns to a long forecast frame.
+
+    df holds the history (one row per year per series) and forecasts holds
+    group_col, year_start and forecast, e.g. the output of model_zoo.run_all.
+    One q<quantile> column is added per requested quantile. Series may end
+    in different years, so horizons are counted from each series' own last
+    observed year rather than from the first forecast year in the batch.
+    """
+    keys, _, values = to_matrix(df, group_col)
+    last_year = df.groupby(group_col)["year_start"].max()
+    out = forecasts.copy()
+    out["_step"] = out["year_start"] - out[group_col].map(last_year)
+    point = out.pivot_table(
+        index=group_col, columns="_step", values="forecast", aggfunc="first"
+    ).reindex(index=keys, columns=range(1, int(out["_step"].max()) + 1))
+    bands = bootstrap_intervals(
+        values, point.values, quantiles=quantiles, n_sims=n_sims, seed=seed
+    )
+
+    for q, band in zip(quantiles, bands):
+        long = pd.DataFrame(band, index=keys, columns=point.columns).stack()
+        long.name = f"q{q:g}"
+        out = out.merge(
+            long.reset_index(),
+            on=[group_col, "_step"],
+            how="left",
+        )
+    return out.drop(columns="_step")
+
+
+def forecast_with_intervals(
+    df,
+    group_col="level_description",
+    horizon=5,
+    models=None,
+    workers=None,
+    quantiles=DEFAULT_QUANTILES,
+    n_sims=5000,
+    seed=0,
+):
+    """Model zoo selection and forecasts with bootstrap bands added."""
+    selection, forecasts = model_zoo.run_all(
+        df, group_col=group_col, horizon=horizon, models=models, workers=workers
+    )
+    forecasts = batch_intervals(
+        df, forecasts, group_col, quantiles=quantiles, n_sims=n_sims, seed=seed
+    )
+    return selection, forecasts
@@ -0,0 +1,231 @@
+import argparse
+import sys
+
+import pandas as pd
+
+import aggregation
+import artifact_store
+import area_reconciliation
+import bootstrap_intervals
+import data_loading
+import data_validation
+import model_zoo
+import report_builder
+import scenarios
+from data_loading import PROCESSED_DIR, annual_rows, load_breakdown
+
+
+def cmd_aggregate(args):
+    mapping = pd.read_csv(args.mapping)
+    out = aggregation.aggregate_breakdown(
+        args.breakdown, mapping, alpha=args.alpha, method=args.method
+    )
+    if args.output:
+        out.to_csv(args.output, index=False)
+    else:
+        print(out.to_string(index=False))
+
+
+def cmd_reconcile(args):
+    area_reconciliation.load_crosswalk(args.breakdown, refresh=args.refresh)
+    out = area_reconciliation.consistent_series(args.breakdown)
+    if args.output:
+        out.to_csv(args.output, index=False)
+    else:
+        print(out.to_string(index=False))
+
+
+def cmd_forecast(args):
+    df = annual_rows(load_breakdown(args.breakdown))
+    selection, forecasts = model_zoo.run_all(
+        df, horizon=args.horizon, models=args.models, workers=args.workers
+    )
+    if args.intervals:
+        forecasts = bootstrap_intervals.batch_intervals(
+            df,
+            forecasts,
+            quantiles=args.quantiles,
+            n_sims=args.sims,
+            seed=args.seed,
+        )
+    print(selection.to_string(index=False))
+    if args.output:
+        forecasts.to_csv(args.output, index=False)
+    else:
+        print(forecasts.to_string(index=False))
+
+
+def cmd_validate(args):
+    report = data_validation.validate_all(incremental=args.incremental)
+    if args.report:
+        report.to_csv(args.report, index=False)
+    if report.empty:
+        print("No issues found")
+    else:
+        print(report.groupby(["partition", "rule", "action"]).size().to_string())
+    if (report["action"] == "reject").any():
+        sys.exit(1)
+
+
+def cmd_run(args):
+    params = {
+        "breakdown": args.breakdown,
+        "horizon": args.horizon,
+        "models": args.models,
+        "quantiles": args.quantiles,
+        "sims": args.sims,
+        "seed": args.seed,
+    }
+
+    def compute():
+        selection, forecasts = bootstrap_intervals.forecast_with_intervals(
+            annual_rows(load_breakdown(args.breakdown)),
+            horizon=args.horizon,
+            models=args.models,
+            workers=args.workers,
+            quantiles=args.quantiles,
+            n_sims=args.sims,
+            seed=args.seed,
+        )
+        return {"selection": selection, "forecasts": forecasts}
+
+    run = artifact_store.Run(name=f"forecast-{args.breakdown}")
+    outputs = run.step(
+        "forecast",
+        [f"{PROCESSED_DIR}/{args.breakdown}.csv"],
+        params,
+        compute,
+        [data_loading, model_zoo, bootstrap_intervals],
+    )
+    selection = outputs["selection"]
+    run.metrics = {
+        "series": int(len(selection)),
+        "mean_rmse": round(float(selection["rmse"].mean()), 4),
+    } | {
+        f"selected_{model}": int(n)
+        for model, n in selection["model"].value_counts().items()
+    }
+    run_id = run.save()
+    status = "from cache" if run.steps[-1]["cached"] else "computed"
+    if run.steps[-1]["timed_out"]:
+        status += ", not cached: some fits timed out"
+    print(f"Run {run_id} ({status})")
+
+
+def cmd_diff(args):
+    report = artifact_store.diff_runs(args.run_a, args.run_b)
+    print(report.to_string(index=False))
+
+
+def cmd_scenarios(args):
+    batch = (
+        scenarios.load_scenarios(args.scenarios)
+        if args.scenarios
+        else scenarios.EXAMPLE_SCENARIOS
+    )
+    table = scenarios.run_scenarios(batch, workers=args.workers)
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        print(table.to_string(index=False))
+
+
+def cmd_report(args):
+    mapping = pd.read_csv(args.mapping) if args.mapping else None
+    built = report_builder.build_reports(
+        args.breakdown, mapping=mapping, areas=args.areas, workers=args.workers
+    )
+    print(built.to_string(index=False))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="NHS chronic ACSC admission trends pipeline"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("aggregate", help="Rates and CIs for a custom grouping of areas")
+    p.add_argument("mapping", help="CSV with level_description and group columns")
+    p.add_argument("--breakdown", default="lower_tier_local_authority")
+    p.add_argument("--method", choices=["exact", "byar"], default="exact")
+    p.add_argument("--alpha", type=float, default=0.05)
+    p.add_argument("--output", help="Write CSV here instead of printing")
+    p.set_defaults(func=cmd_aggregate)
+
+    p = sub.add_parser("reconcile", help="Local authority series on current boundaries")
+    p.add_argument("--breakdown", default="lower_tier_local_authority")
+    p.add_argument("--refresh", action="store_true", help="Rebuild the crosswalk")
+    p.add_argument("--output", help="Write CSV here instead of printing")
+    p.set_defaults(func=cmd_reconcile)
+
+    p = sub.add_parser("forecast", help="Per-series automatic model selection")
+    p.add_argument("--breakdown", default="england")
+    p.add_argument("--horizon", type=int, default=5)
+    p.add_argument("--models", nargs="+", choices=sorted(model_zoo.MODELS))
+    p.add_argument("--workers", type=int, help="Process pool size (1 = serial)")
+    p.add_argument(
+        "--intervals", action="store_true", help="Add residual bootstrap bands"
+    )
+    p.add_argument(
+        "--quantiles",
+        type=float,
+        nargs="+",
+        default=list(bootstrap_intervals.DEFAULT_QUANTILES),
+    )
+    p.add_argument("--sims", type=int, default=5000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output", help="Write forecasts CSV here instead of printing")
+    p.set_defaults(func=cmd_forecast)
+
+    p = sub.add_parser("validate", help="Check the processed CSVs")
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only check partitions that changed since the last clean run",
+    )
+    p.add_argument("--report", help="Write the row-level report CSV here")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("run", help="Forecast run recorded in the artifact store")
+    p.add_argument("--breakdown", default="england")
+    p.add_argument("--horizon", type=int, default=5)
+    p.add_argument("--models", nargs="+", choices=sorted(model_zoo.MODELS))
+    p.add_argument("--workers", type=int, help="Process pool size (1 = serial)")
+    p.add_argument(
+        "--quantiles",
+        type=float,
+        nargs="+",
+        default=list(bootstrap_intervals.DEFAULT_QUANTILES),
+    )
+    p.add_argument("--sims", type=int, default=5000)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("diff", help="Compare the outputs of two recorded runs")
+    p.add_argument("run_a", help="Run id, unique prefix, or 'previous'")
+    p.add_argument("run_b", help="Run id, unique prefix, or 'latest'")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser("scenarios", help="Evaluate what-if scenarios as a batch")
+    p.add_argument(
+        "scenarios", nargs="?", help="JSON list of scenarios (default: examples)"
+    )
+    p.add_argument("--workers", type=int, help="Process pool size (1 = serial)")
+    p.add_argument("--output", help="Write the comparison CSV here")
+    p.set_defaults(func=cmd_scenarios)
+
+    p = sub.add_parser("report", help="Build HTML/PDF briefings per area")
+    p.add_argument("--breakdown", default="region")
+    p.add_argument(
+        "--mapping", help="CSV grouping areas of --breakdown, e.g. into ICBs"
+    )
+    p.add_argument("--areas", nargs="+", help="Only build these areas")
+    p.add_argument("--workers", type=int, help="Process pool size (1 = serial)")
+    p.set_defaults(func=cmd_report)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    args.func(args)
@@ -0,0 +1,125 @@
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import bootstrap_intervals
+import model_zoo
+from data_loading import PROCESSED_DIR, annual_rows, financial_year, load_breakdown
+
+CACHE_PATH = f"{PROCESSED_DIR}/condition_decomposition.csv"
+INPUTS = [f"{PROCESSED_DIR}/condition.csv", f"{PROCESSED_DIR}/england.csv"]
+
+
+def decompose(condition, england):
+    """Contribution of each condition to the year-on-year change in England.
+
+    Condition rates add up to the England rate, so the change in England is
+    the sum of the condition changes. Everything is one pivot and one diff
+    over the year x condition matrix.
+    """
+    rates = annual_rows(condition).pivot(
+        index="year_start", columns="level_description", values="indicator_value"
+    )
+    total = annual_rows(england).set_index("year_start")["indicator_value"]
+    total = total.reindex(rates.index)
+
+    change = rates.diff()
+    total_change = total.diff()
+    contribution_pct = change.div(total.shift(), axis=0) * 100
+    share = change.div(total_change, axis=0)
+
+    out = pd.DataFrame(
+        {
+            "rate": rates.stack(),
+            "change": change.stack(),
+            "contribution_pct": contribution_pct.stack(),
+            "share_of_change": share.stack(),
+        }
+    ).reset_index()
+    out = out.rename(columns={"level_description": "condition"})
+    out = out.dropna(subset=["change"])
+    out["england_change_pct"] = out["year_start"].map(total.pct_change() * 100)
+    out["rank"] = (
+        out.groupby("year_start")["change"]
+        .transform(lambda x: x.abs().rank(ascending=False, method="first"))
+        .astype(int)
+    )
+    out["financial_year"] = financial_year(out["year_start"])
+    return out.sort_values(["year_start", "rank"]).reset_index(drop=True)
+
+
+def load_decomposition(refresh=False):
+    """Cached decompose() over the processed files, rebuilt when inputs change."""
+    if (
+        not refresh
+        and os.path.exists(CACHE_PATH)
+        and os.path.getmtime(CACHE_PATH) >= max(map(os.path.getmtime, INPUTS))
+    ):
+        return pd.read_csv(CACHE_PATH)
+    out = decompose(load_breakdown("condition"), load_breakdown("england"))
+    out.to_csv(CACHE_PATH, index=False)
+    return out
+
+
+def top_drivers(decomposition, n=5):
+    """The n conditions with the largest absolute change in each year."""
+    return decomposition[decomposition["rank"] <= n]
+
+
+def plot_contributions(decomposition, n=6, path=None):
+    """Stacked bars of percentage-point contributions, top n conditions overall."""
+    pivot = decomposition.pivot(
+        index="year_start", columns="condition", values="contribution_pct"
+    )
+    top = pivot.abs().sum().sort_values(ascending=False).index[:n]
+    stacked = pivot[top].copy()
+    stacked["other conditions"] = pivot.drop(columns=top).sum(axis=1)
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    bottom_pos = np.zeros(len(stacked))
+    bottom_neg = np.zeros(len(stacked))
+    for col in stacked.columns:
+        values = stacked[col].values
+        bottom = np.where(values >= 0, bottom_pos, bottom_neg)
+        ax.bar(stacked.index, values, bottom=bottom, label=col.title(), alpha=0.8)
+        bottom_pos += np.clip(values, 0, None)
+        bottom_neg += np.clip(values, None, 0)
+
+    ax.plot(
+        stacked.index,
+        stacked.sum(axis=1),
+        marker="o",
+        color="black",
+        label="England % Change",
+    )
+    ax.axhline(0, linewidth=0.8)
+    ax.set_xlabel("Financial Year Start")
+    ax.set_ylabel("Contribution to % Change (percentage points)")
+    ax.set_title("Condition Contributions to Year-on-Year Change in England")
+    ax.legend(loc="lower left", fontsize=8)
+
+    plt.tight_layout()
+    plt.savefig(path or "../visualizations/plot19_condition_contributions.png", dpi=300)
+    plt.close()
+
+
+def forecast_conditions(horizon=5, workers=None, seed=0):
+    """Model zoo forecasts with bootstrap bands for every condition in one batch."""
+    df = annual_rows(load_breakdown("condition"))
+    selection, forecasts = model_zoo.run_all(df, horizon=horizon, workers=workers)
+    forecasts = bootstrap_intervals.batch_intervals(df, forecasts, seed=seed)
+    return selection, forecasts.rename(columns={"level_description": "condition"})
+
+
+if __name__ == "__main__":
+    decomposition = load_decomposition(refresh=True)
+    for year in [2020, 2021, decomposition["year_start"].max()]:
+        drivers = top_drivers(decomposition[decomposition["year_start"] == year])
+        columns = ["financial_year", "condition", "change", "contribution_pct"]
+        print(drivers[columns].to_string(index=False))
+    plot_contributions(decomposition)
+
+    selection, forecasts = forecast_conditions()
+    forecasts.to_csv(f"{PROCESSED_DIR}/condition_forecasts.csv", index=False)
@@ -0,0 +1,57 @@
+import pandas as pd
+
+PROCESSED_DIR = "../data/processed"
+KEY_COLS = ["year_start", "level_description"]
+ANNUAL_SHARE = 0.9
+
+
+def load_breakdown(name):
+    """Read one of the breakdown files written by data_cleaning.py."""
+    return pd.read_csv(f"{PROCESSED_DIR}/{name}.csv")
+
+
+def _top_rows(df):
+    """Largest-observed row per year/area and whether it is the annual figure.
+
+    The quarter column is dropped during cleaning, so every year/area has the
+    annual figure followed by up to four quarterly rows, and the annual row is
+    the one with the largest observed count. Cleaning sometimes drops the
+    annual row itself, leaving only quarters. The annual count is the sum of
+    the quarters, so the largest row only counts as annual when it is at
+    least twice the single other row, or at least ANNUAL_SHARE of the other
+    rows' total when there are several (counts are rounded in the LA files).
+    """
+    df = df.drop_duplicates()
+    grouped = df.groupby(KEY_COLS)["observed"]
+    top = df.loc[grouped.idxmax().dropna()]
+    keys = pd.MultiIndex.from_frame(top[KEY_COLS])
+    n_rows = grouped.size().reindex(keys).values
+    others = grouped.sum().reindex(keys).values - top["observed"].values
+    annual = (
+        (n_rows == 1)
+        | ((n_rows == 2) & (top["observed"].values >= 2 * others))
+        | ((n_rows > 2) & (top["observed"].values >= ANNUAL_SHARE * others))
+    )
+    return top, annual
+
+
+def annual_rows(df):
+    """Keep the annual row for each year/area.
+
+    Year/areas whose annual row is missing are dropped rather than
+    represented by a quarter (see missing_annual).
+    """
+    top, annual = _top_rows(df)
+    return top[annual].sort_values(KEY_COLS).reset_index(drop=True)
+
+
+def missing_annual(df):
+    """Year/areas that only have quarterly rows."""
+    top, annual = _top_rows(df)
+    return top.loc[~annual, KEY_COLS].sort_values(KEY_COLS).reset_index(drop=True)
+
+
+def financial_year(year_start):
+    """Label a year_start series as 2023/24 style financial years."""
+    year_start = year_start.astype(int)
+    return year_start.astype(str) + "/" + (year_start + 1).astype(str).str[-2:]
@@ -0,0 +1,255 @@
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loading import KEY_COLS, PROCESSED_DIR, missing_annual
+
+STATE_PATH = f"{PROCESSED_DIR}/.validation_state.json"
+ROUNDING = 0.05  # indicator_value is published to one decimal place
+
+SCHEMA = {
+    "year": "object",
+    "breakdown": "object",
+    "level_description": "object",
+    "indicator_value": "float",
+    "lower_ci": "float",
+    "upper_ci": "float",
+    "standardised_ratio": "float",
+    "observed": "float",
+    "population": "float",
+    "percent_unclassified": "float",
+    "year_start": "int",
+    "financial_year": "object",
+    "ci_width": "float",
+    "high_uncertainty": "int",
+}
+
+# Files in the processed folder that are not breakdown partitions.
+DERIVED_SUFFIXES = (
+    "_crosswalk.csv",
+    "_reconciled.csv",
+    "_forecasts.csv",
+    "_model_selection.csv",
+    "_decomposition.csv",
+)
+
+
+def _year_gaps(df):
+    """Flag the first row of a year when the previous year is missing."""
+    years = df[["level_description", "year_start"]].drop_duplicates()
+    years = years.sort_values(["level_description", "year_start"])
+    step = years.groupby("level_description")["year_start"].diff()
+    gaps = years.loc[step > 1, ["level_description", "year_start"]]
+    flagged = df.merge(gaps.assign(_gap=True), how="left")["_gap"]
+    return flagged.fillna(False).astype(bool).values
+
+
+def _missing_annual(df):
+    """Flag every row of a year/area whose annual row is missing."""
+    missing = missing_annual(df)
+    flagged = df.merge(missing.assign(_missing=True), on=KEY_COLS, how="left")
+    return flagged["_missing"].fillna(False).astype(bool).values
+
+
+# RULES
+# (name, action, reason, check). check returns a boolean array that is True
+# for failing rows. "reject" rows are unusable, "quarantine" rows are kept out
+# of the clean output for review.
+RULES = [
+    (
+        "missing_key",
+        "reject",
+        "year, breakdown, level_description or indicator_value is missing",
+        lambda df: df[["year", "breakdown", "level_description", "indicator_value"]]
+        .isna()
+        .any(axis=1)
+        .values,
+    ),
+    (
+        "negative_count",
+        "reject",
+        "observed or population is negative",
+        lambda df: ((df["observed"] < 0) | (df["population"] < 0)).values,
+    ),
+    (
+        "zero_population",
+        "reject",
+        "population is zero or missing",
+        lambda df: ~(df["population"] > 0).values,
+    ),
+    (
+        "ci_order",
+        "reject",
+        "indicator_value lies outside lower_ci and upper_ci",
+        lambda df: (
+            (df["lower_ci"] > df["indicator_value"])
+            | (df["indicator_value"] > df["upper_ci"])
+        ).values,
+    ),
+    (
+        "duplicate_row",
+        "quarantine",
+        "row duplicates another row in every column",
+        lambda df: df.duplicated().values,
+    ),
+    (
+        "financial_year",
+        "quarantine",
+        "financial_year does not match year_start",
+        lambda df: (
+            df["financial_year"].astype(str)
+            != df["year_start"].astype(int).astype(str)
+            + "/"
+            + (df["year_start"].astype(int) + 1).astype(str).str[-2:]
+        ).values,
+    ),
+    (
+        "ci_width",
+        "quarantine",
+        "ci_width is not upper_ci - lower_ci",
+        lambda df: ~np.isclose(df["ci_width"], df["upper_ci"] - df["lower_ci"]),
+    ),
+    (
+        "percent_unclassified",
+        "quarantine",
+        "percent_unclassified outside 0-100",
+        lambda df: ~df["percent_unclassified"].between(0, 100).values,
+    ),
+    (
+        "rate_mismatch",
+        "quarantine",
+        "indicator_value differs from observed/population by more than 3x",
+        lambda df: _rate_mismatch(df),
+    ),
+    (
+        "standardised_ratio",
+        "quarantine",
+        "standardised_ratio is not positive (or not zero for zero observed)",
+        lambda df: ~(
+            (df["standardised_ratio"] > 0)
+            | ((df["standardised_ratio"] == 0) & (df["observed"] == 0))
+        ).values,
+    ),
+    ("year_gap", "quarantine", "previous year missing for this area", _year_gaps),
+    (
+        "missing_annual",
+        "quarantine",
+        "only quarterly rows for this year/area, the annual row is missing",
+        _missing_annual,
+    ),
+]
+
+
+def _rate_mismatch(df):
+    """Catch observed counts that cannot produce the published rate.
+
+    expected is dropped during cleaning, so the standardised rate is compared
+    with the crude rate instead; they rarely differ by more than a factor of
+    three unless observed was imputed or mis-keyed. indicator_value is
+    published to one decimal place, so the check uses its rounding interval
+    (±0.05) rather than the rounded value, otherwise every tiny condition
+    rate published as 0.0 would fail.
+    """
+    crude = df["observed"] / df["population"] * 100000
+    low = df["indicator_value"] - ROUNDING
+    high = df["indicator_value"] + ROUNDING
+    return ((crude > 3 * high) | (crude < low / 3)).values & (df["observed"] > 0).values
+
+
+def check_schema(df):
+    """Column-level problems: missing columns and non-numeric values."""
+    problems = []
+    for col, kind in SCHEMA.items():
+        if col not in df.columns:
+            problems.append(f"missing column {col}")
+        elif kind in ("float", "int") and not pd.api.types.is_numeric_dtype(df[col]):
+            problems.append(f"column {col} is not numeric")
+    return problems
+
+
+def validate(df, partition=""):
+    """Run every rule over one partition in a single pass.
+
+    Returns (clean, report). The report has one row per failing row and
+    rule, with the action taken and the reason.
+    """
+    problems = check_schema(df)
+    if problems:
+        report = pd.DataFrame(
+            {
+                "partition": partition,
+                "row": -1,
+                "rule": "schema",
+                "action": "reject",
+                "reason": problems,
+            }
+        )
+        return df.iloc[0:0], report
+
+    failures = np.column_stack([check(df) for _, _, _, check in RULES])
+    rows, rule_idx = np.nonzero(failures)
+    report = pd.DataFrame(
+        {
+            "partition": partition,
+            "row": df.index.values[rows],
+            "rule": [RULES[i][0] for i in rule_idx],
+            "action": [RULES[i][1] for i in rule_idx],
+            "reason": [RULES[i][2] for i in rule_idx],
+        }
+    )
+    return df.drop(index=report["row"].unique()), report
+
+
+def partitions():
+    return sorted(
+        path
+        for path in glob.glob(f"{PROCESSED_DIR}/*.csv")
+        if not path.endswith(DERIVED_SUFFIXES)
+        and not path.endswith("after_cleaning.csv")
+    )
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def validate_all(incremental=False):
+    """Validate every processed partition and return the combined report.
+
+    With incremental=True only partitions whose content hash changed since
+    the last clean run are checked.
+    """
+    state = {}
+    if incremental and os.path.exists(STATE_PATH):
+        with open(STATE_PATH) as f:
+            state = json.load(f)
+
+    reports = []
+    for path in partitions():
+        name = os.path.basename(path)
+        digest = _file_hash(path)
+        if state.get(name) == digest:
+            continue
+        _, report = validate(pd.read_csv(path), partition=name)
+        reports.append(report)
+        if not (report["action"] == "reject").any():
+            state[name] = digest
+        else:
+            state.pop(name, None)
+
+    with open(STATE_PATH, "w") as f:
+        json.dump(state, f, indent=2)
+
+    if not reports:
+        return pd.DataFrame(columns=["partition", "row", "rule", "action", "reason"])
+    return pd.concat(reports, ignore_index=True)
+
+
+if __name__ == "__main__":
+    report = validate_all()
+    print(report.groupby(["partition", "rule", "action"]).size().to_string())
@@ -0,0 +1,348 @@
+import contextlib
+import math
+import multiprocessing
+import signal
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+from data_loading import PROCESSED_DIR, annual_rows, load_breakdown
+
+COVID_YEAR = 2020
+TEST_SIZE = 0.2
+DEFAULT_BUDGET = 2.0  # seconds allowed per model per series
+MAX_ITER = 200  # optimiser iteration cap for the iterative models
+
+# MODEL REGISTRY
+# Every model is a function (train_years, train_values, future_years) -> array
+# of point forecasts for future_years. Register new ones with @register.
+# A model that runs past its budget on a series is dropped for that series
+# (listed in over_budget), so selection only depends on timing when a budget
+# is actually hit; the selection table flags those series in timed_out.
+MODELS = {}
+BUDGETS = {}
+
+
+def register(name, budget=DEFAULT_BUDGET):
+    def wrap(func):
+        MODELS[name] = func
+        BUDGETS[name] = budget
+        return func
+
+    return wrap
+
+
+@register("naive", budget=0.5)
+def naive(years, values, future_years):
+    return np.full(len(future_years), values[-1], dtype=float)
+
+
+@register("drift", budget=0.5)
+def drift(years, values, future_years):
+    slope = (values[-1] - values[0]) / (years[-1] - years[0])
+    return values[-1] + slope * (np.asarray(future_years) - years[-1])
+
+
+@register("linear", budget=0.5)
+def linear(years, values, future_years):
+    model = LinearRegression().fit(np.reshape(years, (-1, 1)), values)
+    return model.predict(np.reshape(future_years, (-1, 1)))
+
+
+@register("piecewise_covid", budget=0.5)
+def piecewise_covid(years, values, future_years):
+    """Linear trend with a 2020/21 dummy and a slope change after COVID."""
+
+    def design(y):
+        y = np.asarray(y, dtype=float)
+        return np.column_stack(
+            [
+                np.ones_like(y),
+                y - years[0],
+                (y == COVID_YEAR).astype(float),
+                np.clip(y - COVID_YEAR, 0, None),
+            ]
+        )
+
+    coef, *_ = np.linalg.lstsq(design(years), values, rcond=None)
+    return design(future_years) @ coef
+
+
+@register("ets")
+def ets(years, values, future_years):
+    fit = ExponentialSmoothing(values, trend="add", damped_trend=True).fit(
+        minimize_kwargs={"options": {"maxiter": MAX_ITER}}
+    )
+    steps = (np.asarray(future_years) - years[-1]).astype(int)
+    return fit.forecast(int(steps.max()))[steps - 1]
+
+
+@register("arima")
+def arima(years, values, future_years):
+    fit = ARIMA(values, order=(1, 1, 0), trend="t").fit(
+        method_kwargs={"maxiter": MAX_ITER}
+    )
+    steps = (np.asarray(future_years) - years[-1]).astype(int)
+    return fit.forecast(int(steps.max()))[steps - 1]
+
+
+@register("prophet", budget=10.0)
+def prophet(years, values, future_years):
+    # Imported lazily: prophet is slow to import and optional for the zoo.
+    from prophet import Prophet
+
+    history = pd.DataFrame(
+        {"ds": pd.to_datetime(pd.Series(years).astype(str), format="%Y"), "y": values}
+    )
+    model = Prophet(
+        yearly_seasonality=False,
+        weekly_seasonality=False,
+        daily_seasonality=False,
+        changepoint_prior_scale=0.05,
+        uncertainty_samples=0,
+    )
+    model.fit(history, iter=MAX_ITER * 5)
+    future = pd.DataFrame(
+        {"ds": pd.to_datetime(pd.Series(future_years).astype(str), format="%Y")}
+    )
+    return model.predict(future)["yhat"].values
+
+
+# AUTOMATIC SELECTION
+class ModelTimeout(Exception):
+    """Raised inside a fit that ran past its model's budget."""
+
+
+@contextlib.contextmanager
+def _time_limit(seconds):
+    """Interrupt the enclosed fit after seconds.
+
+    Uses SIGALRM, so the limit only applies on Unix in the main thread (pool
+    workers run tasks there); elsewhere the run_all deadline still applies.
+    """
+    if (
+        not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise ModelTimeout()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _predict(name, years, values, future_years):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return np.asarray(MODELS[name](years, values, future_years), dtype=float)
+
+
+def _backtest(name, years, values, n_test):
+    """Rolling-origin one-step-ahead RMSE over the last n_test years.
+
+    Each of the last n_test years is forecast from the years before it, so
+    once the origin passes 2020 the COVID shock is part of the training data.
+    Returns the RMSE, or None if the model fails or returns non-finite values.
+    """
+    errors = []
+    for i in range(len(years) - n_test, len(years)):
+        if i < 3:
+            continue
+        try:
+            pred = _predict(name, years[:i], values[:i], years[i : i + 1])
+        except ModelTimeout:
+            raise
+        except Exception:
+            return None
+        if not np.all(np.isfinite(pred)):
+            return None
+        errors.append(values[i] - pred[0])
+    if not errors:
+        return None
+    return float(np.sqrt(np.mean(np.square(errors))))
+
+
+def select_and_forecast(key, years, values, horizon=5, models=None):
+    """Backtest every model on the last 20% of a series and forecast with the best.
+
+    A model is dropped for this series if it fails, returns non-finite values
+    or runs past its budget. piecewise_covid is only considered
+    when 2020 falls inside at least one backtest training window, otherwise
+    it is identical to linear. Ties (within 1e-6) go to the model registered
+    first, i.e. the simpler one. If the best model cannot produce the final
+    forecast the next best is used. selected_by is "backtest" for a scored
+    choice and "fallback" when no model could be scored (fewer than four
+    years, or every model failed) and the naive forecast is used instead.
+    """
+    years = np.asarray(years, dtype=float)
+    values = np.asarray(values, dtype=float)
+    models = list(models or MODELS)
+    n_test = max(1, int(np.ceil(len(years) * TEST_SIZE)))
+    if len(years) < 2 or years[-2] < COVID_YEAR:
+        models = [m for m in models if m != "piecewise_covid"]
+
+    scores = {}
+    over_budget = []
+    for name in models:
+        try:
+            with _time_limit(BUDGETS.get(name, DEFAULT_BUDGET)):
+                rmse = _backtest(name, years, values, n_test)
+        except ModelTimeout:
+            over_budget.append(name)
+            continue
+        if rmse is not None:
+            scores[name] = rmse
+
+    order = list(MODELS)
+    ranked = sorted(scores, key=lambda m: (round(scores[m], 6), order.index(m)))
+    future_years = np.arange(years[-1] + 1, years[-1] + 1 + horizon)
+    for best in ranked:
+        try:
+            with _time_limit(BUDGETS.get(best, DEFAULT_BUDGET)):
+                forecast = _predict(best, years, values, future_years)
+        except ModelTimeout:
+            over_budget.append(best)
+            continue
+        except Exception:
+            continue
+        if np.all(np.isfinite(forecast)):
+            selected_by = "backtest"
+            break
+    else:
+        best, selected_by = "naive", "fallback"
+        forecast = naive(years, values, future_years)
+
+    return {
+        "key": key,
+        "model": best,
+        "selected_by": selected_by,
+        "rmse": scores.get(best, np.nan),
+        "scores": scores,
+        "year_start": future_years.astype(int),
+        "forecast": forecast,
+        "timed_out": bool(over_budget),
+        "over_budget": over_budget,
+    }
+
+
+def _fallback(key, years, values, horizon):
+    """Naive forecast for a series still running at the run_all deadline."""
+    future_years = np.arange(years[-1] + 1, years[-1] + 1 + horizon)
+    return {
+        "key": key,
+        "model": "naive",
+        "selected_by": "deadline",
+        "rmse": np.nan,
+        "scores": {},
+        "year_start": future_years.astype(int),
+        "forecast": naive(years, values, future_years),
+        "timed_out": True,
+        "over_budget": [],
+    }
+
+
+def _run_one(args):
+    return select_and_forecast(*args)
+
+
+def run_all(df, group_col="level_description", horizon=5, models=None, workers=None):
+    """Select a model per series and forecast every series in a process pool.
+
+    df must hold one row per year per series. Each model fit is limited to
+    its own budget inside select_and_forecast, so a slow model is dropped for
+    that series only. As a backstop for fits that cannot be interrupted, the
+    whole batch gets a deadline of twice the per-series budget (sum of the
+    model budgets, once for the backtest and once for the final fit) times
+    the number of series per worker; series still running then get a naive
+    forecast (selected_by "deadline") and the pool is terminated so a hung
+    fit cannot hold up the run. Series affected by either limit are flagged
+    in the timed_out column. Returns a selection table and a long frame of
+    forecasts.
+    """
+    df = df.sort_values([group_col, "year_start"])
+    tasks = [
+        (
+            key,
+            g["year_start"].values,
+            g["indicator_value"].values,
+            horizon,
+            models,
+        )
+        for key, g in df.groupby(group_col)
+    ]
+    workers = workers or multiprocessing.cpu_count()
+    series_budget = sum(BUDGETS.get(m, DEFAULT_BUDGET) for m in models or MODELS)
+    deadline = time.monotonic() + 2 * series_budget * math.ceil(len(tasks) / workers)
+
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        pending = [pool.apply_async(_run_one, (task,)) for task in tasks]
+        results = []
+        for task, result in zip(tasks, pending):
+            try:
+                results.append(
+                    result.get(timeout=max(0.0, deadline - time.monotonic()))
+                )
+            except multiprocessing.TimeoutError:
+                key, years, values, horizon, _ = task
+                results.append(_fallback(key, years, values, horizon))
+    finally:
+        pool.terminate()
+        pool.join()
+
+    selection = pd.DataFrame(
+        [
+            {
+                group_col: r["key"],
+                "model": r["model"],
+                "selected_by": r["selected_by"],
+                "rmse": r["rmse"],
+                "timed_out": r["timed_out"],
+                "over_budget": ",".join(r["over_budget"]),
+            }
+            | {f"rmse_{m}": s for m, s in r["scores"].items()}
+            for r in results
+        ]
+    )
+    forecasts = pd.DataFrame(
+        {
+            group_col: np.repeat(
+                [r["key"] for r in results], [len(r["forecast"]) for r in results]
+            ),
+            "year_start": np.concatenate([r["year_start"] for r in results]),
+            "model": np.repeat(
+                [r["model"] for r in results], [len(r["forecast"]) for r in results]
+            ),
+            "forecast": np.concatenate([r["forecast"] for r in results]),
+        }
+    )
+    return selection, forecasts
+
+
+if __name__ == "__main__":
+    for breakdown in ["england", "age", "gender", "region", "2015_deprivation_decile"]:
+        df = annual_rows(load_breakdown(breakdown))
+        start = time.perf_counter()
+        selection, forecasts = run_all(df)
+        print(
+            f"{breakdown}: {len(selection)} series in {time.perf_counter() - start:.1f}s"
+        )
+        print(selection["model"].value_counts().to_string())
+        selection.to_csv(
+            f"{PROCESSED_DIR}/{breakdown}_model_selection.csv", index=False
+        )
+        forecasts.to_csv(f"{PROCESSED_DIR}/{breakdown}_forecasts.csv", index=False)
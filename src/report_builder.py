@@ -0,0 +1,344 @@
+import base64
+import html
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from string import Template
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import aggregation
+import artifact_store
+import condition_decomposition
+import data_loading
+import model_zoo
+from data_loading import PROCESSED_DIR, annual_rows, load_breakdown
+
+REPORT_DIR = "../reports"
+SECTION_DIR = f"{artifact_store.ARTIFACT_DIR}/sections"
+VISUALIZATION_DIR = "../visualizations"
+# Modules whose code renders sections; their source is part of the cache key.
+SECTION_MODULES = [aggregation, condition_decomposition, data_loading, model_zoo]
+
+PAGE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body { font-family: Arial, sans-serif; max-width: 960px; margin: 2em auto; color: #222; }
+h1 { color: #005eb8; }
+h2 { color: #005eb8; border-bottom: 1px solid #ccc; padding-bottom: 0.2em; }
+table { border-collapse: collapse; margin: 0.5em 0 1em; }
+td, th { border: 1px solid #ccc; padding: 0.3em 0.6em; text-align: right; }
+th { background: #f0f4f5; }
+img { max-width: 100%; }
+.note { color: #666; font-size: 0.9em; }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+<p class="note">Generated $generated from NHS Outcomes Framework indicator 2.3.i.</p>
+$sections
+</body>
+</html>
+""")
+
+
+# HELPERS
+def _figure_html(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=120, bbox_inches="tight")
+    plt.close(fig)
+    return _png_html(buf.getvalue())
+
+
+def _png_html(data):
+    encoded = base64.b64encode(data).decode()
+    return f'<img src="data:image/png;base64,{encoded}">'
+
+
+def _cached_figure(name):
+    """Embed a figure already rendered by eda.py / predictive_modelling.py."""
+    path = f"{VISUALIZATION_DIR}/{name}"
+    if not os.path.exists(path):
+        return f'<p class="note">Figure {html.escape(name)} not rendered yet.</p>'
+    with open(path, "rb") as f:
+        return _png_html(f.read())
+
+
+def _table(rows):
+    body = "".join(
+        f"<tr><th>{html.escape(str(k))}</th><td>{html.escape(str(v))}</td></tr>"
+        for k, v in rows.items()
+    )
+    return f"<table>{body}</table>"
+
+
+def section(name, input_paths, params, render, data_hash=""):
+    """Return a section's HTML, re-rendering only when its inputs change.
+
+    The cache key covers the section name, the content of its input files
+    (or data_hash for in-memory inputs), its parameters and the source of this
+    module and SECTION_MODULES, so code changes rebuild cached fragments.
+    """
+    code = {m.__name__: artifact_store.hash_file(m.__file__) for m in SECTION_MODULES}
+    code["report_builder"] = artifact_store.hash_file(__file__)
+    key = artifact_store.hash_bytes(
+        json.dumps(
+            {
+                "section": name,
+                "code": code,
+                "inputs": {p: artifact_store.hash_file(p) for p in input_paths},
+                "data": data_hash,
+                "params": params,
+            },
+            sort_keys=True,
+        ).encode()
+    )
+    path = f"{SECTION_DIR}/{key}.html"
+    if os.path.exists(path):
+        with open(path) as f:
+            return f.read(), True
+    content = f"<h2>{html.escape(name)}</h2>\n{render()}"
+    os.makedirs(SECTION_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return content, False
+
+
+# NATIONAL SECTIONS
+def _yoy(df):
+    series = annual_rows(df).set_index("year_start")["indicator_value"]
+    return series, series.pct_change() * 100
+
+
+def render_england():
+    series, yoy = _yoy(load_breakdown("england"))
+    first, last = series.index.min(), series.index.max()
+    metrics = {
+        f"Rate {first}/{str(first + 1)[-2:]} (per 100,000)": f"{series[first]:.1f}",
+        f"Rate {last}/{str(last + 1)[-2:]} (per 100,000)": f"{series[last]:.1f}",
+        "Change over period": f"{(series[last] / series[first] - 1) * 100:+.1f}%",
+        "Years with change beyond ±5%": int((yoy.abs() > 5).sum()),
+        "Largest annual fall": f"{yoy.min():+.1f}% in {yoy.idxmin()}/"
+        f"{str(yoy.idxmin() + 1)[-2:]}",
+        "Largest annual rise": f"{yoy.max():+.1f}% in {yoy.idxmax()}/"
+        f"{str(yoy.idxmax() + 1)[-2:]}",
+    }
+    return _table(metrics)
+
+
+def render_forecast():
+    df = annual_rows(load_breakdown("england"))
+    fit = model_zoo.select_and_forecast(
+        "england", df["year_start"].values, df["indicator_value"].values
+    )
+    metrics = {"Selected model": fit["model"], "Backtest RMSE": f"{fit['rmse']:.2f}"}
+    metrics |= {f"RMSE {m}": f"{s:.2f}" for m, s in sorted(fit["scores"].items())}
+    metrics |= {
+        f"Forecast {int(y)}/{str(int(y) + 1)[-2:]}": f"{v:.1f}"
+        for y, v in zip(fit["year_start"], fit["forecast"])
+    }
+    return _table(metrics)
+
+
+def render_age():
+    age = annual_rows(load_breakdown("age"))
+    latest = age[age["year_start"] == age["year_start"].max()]
+    older = latest["level_description"].isin(
+        ["75 to 79", "80 to 84", "85 to 89", "90+"]
+    )
+    weighted = latest.assign(w=latest["indicator_value"] * latest["population"])
+
+    def rate(d):
+        return d["w"].sum() / d["population"].sum()
+
+    metrics = {
+        "Rate aged 75+": f"{rate(weighted[older]):.1f}",
+        "Rate under 75": f"{rate(weighted[~older]):.1f}",
+        "Ratio 75+ / under 75": f"{rate(weighted[older]) / rate(weighted[~older]):.1f}",
+    }
+    return _table(metrics)
+
+
+def render_deprivation():
+    dep = annual_rows(load_breakdown("2015_deprivation_decile"))
+    pivot = dep.pivot(
+        index="year_start", columns="level_description", values="indicator_value"
+    )
+    ratio = pivot["1 - most deprived"] / pivot["10 - least deprived"]
+    metrics = {
+        f"D1/D10 ratio {ratio.index.min()}": f"{ratio.iloc[0]:.2f}",
+        f"D1/D10 ratio {ratio.index.max()}": f"{ratio.iloc[-1]:.2f}",
+        "Highest ratio": f"{ratio.max():.2f} in {ratio.idxmax()}",
+    }
+    return _table(metrics)
+
+
+def render_conditions():
+    decomposition = condition_decomposition.load_decomposition()
+    latest = decomposition[
+        decomposition["year_start"] == decomposition["year_start"].max()
+    ]
+    top = condition_decomposition.top_drivers(latest)
+    metrics = {
+        row["condition"].title(): f"{row['contribution_pct']:+.2f} pp"
+        for _, row in top.iterrows()
+    }
+    return _table(metrics)
+
+
+# (title, breakdowns read, figures embedded from visualizations/, render)
+NATIONAL_SECTIONS = [
+    (
+        "England trend and volatility",
+        ["england"],
+        ["plot1_england_trend.png", "plot3_yoy_change.png"],
+        render_england,
+    ),
+    (
+        "Forecast",
+        ["england"],
+        ["Forecast/predictive_plot1_forecast_trend_pi.png"],
+        render_forecast,
+    ),
+    ("Age", ["age"], ["plot6_age_heatmap.png"], render_age),
+    (
+        "Deprivation",
+        ["2015_deprivation_decile"],
+        ["plot18_inequality_ratio_dual.png"],
+        render_deprivation,
+    ),
+    (
+        "Condition drivers",
+        ["condition", "england"],
+        ["plot19_condition_contributions.png"],
+        render_conditions,
+    ),
+]
+
+
+def national_sections():
+    """Render the shared sections; figure files count as inputs too."""
+    parts = []
+    for name, breakdowns, figures, render in NATIONAL_SECTIONS:
+        paths = [f"{PROCESSED_DIR}/{b}.csv" for b in breakdowns]
+        paths += [
+            f"{VISUALIZATION_DIR}/{f}"
+            for f in figures
+            if os.path.exists(f"{VISUALIZATION_DIR}/{f}")
+        ]
+        content, _ = section(
+            name,
+            paths,
+            {"figures": figures},
+            lambda: render() + "".join(map(_cached_figure, figures)),
+        )
+        parts.append(content)
+    return parts
+
+
+# AREA SECTIONS
+def render_area(area, series, england):
+    series = series.sort_values("year_start")
+    values = series.set_index("year_start")["indicator_value"]
+    yoy = values.pct_change() * 100
+    fit = model_zoo.select_and_forecast(area, values.index.values, values.values)
+    last = values.index.max()
+    metrics = {
+        f"Rate {last}/{str(last + 1)[-2:]}": f"{values[last]:.1f}",
+        "Change over period": f"{(values[last] / values.iloc[0] - 1) * 100:+.1f}%",
+        "Ratio to England (latest)": f"{values[last] / england[last]:.2f}",
+        "Years with change beyond ±5%": int((yoy.abs() > 5).sum()),
+        "Forecast model": fit["model"],
+        f"Forecast {int(fit['year_start'][-1])}/"
+        f"{str(int(fit['year_start'][-1]) + 1)[-2:]}": f"{fit['forecast'][-1]:.1f}",
+    }
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(values.index, values.values, marker="o", label=area.title())
+    ax.plot(england.index, england.values, linestyle="--", label="England")
+    ax.plot(fit["year_start"], fit["forecast"], marker="o", label="Forecast")
+    ax.axvspan(2020, 2021, alpha=0.1, color="gray", label="COVID-19 Period")
+    ax.set_xlabel("Financial Year Start")
+    ax.set_ylabel("Admission Rate (per 100,000)")
+    ax.set_title(f"{area.title()}: Chronic ACSC Admission Rates")
+    ax.legend(loc="upper left")
+    return _table(metrics) + _figure_html(fig)
+
+
+def _build_one(args):
+    area, series, england, national = args
+    data_hash = artifact_store.hash_bytes(series.to_csv(index=False).encode())
+    content, cached = section(
+        area.title(),
+        [f"{PROCESSED_DIR}/england.csv"],
+        {},
+        lambda: render_area(area, series, england),
+        data_hash=data_hash,
+    )
+    page = PAGE.substitute(
+        title=f"Chronic ACSC Admissions Briefing: {html.escape(area.title())}",
+        generated=time.strftime("%d %B %Y"),
+        sections="\n".join([content] + national),
+    )
+    path = f"{REPORT_DIR}/{area.replace(' ', '_').replace('/', '_')}.html"
+    with open(path, "w") as f:
+        f.write(page)
+    _write_pdf(path)
+    return area, path, cached
+
+
+def _write_pdf(path):
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        return None
+    pdf_path = path[: -len(".html")] + ".pdf"
+    HTML(path).write_pdf(pdf_path)
+    return pdf_path
+
+
+def area_series(breakdown="region", mapping=None):
+    """Annual series per area, or per group when an area-to-group mapping is given."""
+    if mapping is None:
+        return annual_rows(load_breakdown(breakdown))
+    grouped = aggregation.aggregate_breakdown(breakdown, mapping)
+    return grouped.rename(columns={"group": "level_description"})
+
+
+def build_reports(breakdown="region", mapping=None, areas=None, workers=None):
+    """Write one HTML (and PDF if weasyprint is installed) briefing per area.
+
+    National sections are rendered once and shared; each area section is
+    re-rendered only when that area's data or England's data changed.
+    Briefings are built across a process pool.
+    """
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    national = national_sections()
+    england = annual_rows(load_breakdown("england")).set_index("year_start")[
+        "indicator_value"
+    ]
+    df = area_series(breakdown, mapping)
+    tasks = [
+        (area, g[["year_start", "indicator_value"]], england, national)
+        for area, g in df.groupby("level_description")
+        if areas is None or area in areas
+    ]
+    if workers == 1:
+        results = list(map(_build_one, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_build_one, tasks))
+    return pd.DataFrame(results, columns=["area", "path", "cached"])
+
+
+if __name__ == "__main__":
+    print(build_reports().to_string(index=False))
@@ -0,0 +1,191 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import model_zoo
+from data_loading import annual_rows, load_breakdown
+
+# Scenarios are plain dicts so they can be kept in JSON files:
+#   name        label used in the output table
+#   breakdown   processed file to forecast (default "england")
+#   series      list of level_description values to keep (default: all)
+#   exclude     list of year_start values to drop before fitting
+#   adjust      {"from": 2025, "rate": -0.05} compounds a yearly multiplicative
+#               change onto the forecast from that year on
+#   horizon     years to forecast (default 5)
+#   models      model zoo names to choose from (default: all)
+EXAMPLE_SCENARIOS = [
+    {"name": "baseline"},
+    {"name": "exclude covid", "exclude": [2020, 2021]},
+    {
+        "name": "aged 75+ -5% a year from 2025",
+        "breakdown": "age",
+        "series": ["75 to 79", "80 to 84", "85 to 89", "90+"],
+        "adjust": {"from": 2025, "rate": -0.05},
+    },
+]
+
+# Worker state shared by every scenario: the annual data per breakdown and
+# the fitted forecasts, both computed once in the parent and handed to each
+# worker through the pool initializer.
+_DATA = {}
+_FITS = {}
+
+
+def _init_worker(data, fits):
+    _DATA.update(data)
+    _FITS.update(fits)
+
+
+def _fit_key(scenario, base=False):
+    """Scenarios with the same key share one set of fitted forecasts.
+
+    Without exclusions a scenario uses the base fit of its breakdown; with
+    exclusions only the scenario's own series are refitted.
+    """
+    key = (
+        scenario.get("breakdown", "england"),
+        scenario.get("horizon", 5),
+        tuple(scenario.get("models") or ()),
+    )
+    if base or not scenario.get("exclude"):
+        return key + ((), ())
+    return key + (
+        tuple(sorted(scenario["exclude"])),
+        tuple(sorted(scenario.get("series") or ())),
+    )
+
+
+def scenario_rows(scenario, df):
+    """The annual rows a scenario fits on.
+
+    Raises ValueError when the series filter names unknown series or the
+    exclusions leave a series with fewer than two years.
+    """
+    name = scenario["name"]
+    breakdown = scenario.get("breakdown", "england")
+    if scenario.get("series"):
+        unknown = set(scenario["series"]) - set(df["level_description"])
+        if unknown:
+            raise ValueError(
+                f"Scenario {name!r}: no {breakdown} series named {sorted(unknown)}"
+            )
+        df = df[df["level_description"].isin(scenario["series"])]
+    if scenario.get("exclude"):
+        keys = df["level_description"].unique()
+        df = df[~df["year_start"].isin(scenario["exclude"])]
+        counts = df.groupby("level_description").size().reindex(keys, fill_value=0)
+        short = sorted(counts[counts < 2].index)
+        if short:
+            raise ValueError(
+                f"Scenario {name!r}: fewer than two years left after exclusions "
+                f"for {short}"
+            )
+    return df
+
+
+def fit_scenarios(scenarios, workers=None):
+    """Load each breakdown and fit each distinct base or refit once.
+
+    Fits go through model_zoo.run_all, so every one runs in its process
+    pool under the per-model budgets and batch deadline. Returns the data
+    and the forecasts keyed by _fit_key.
+    """
+    data, fits = {}, {}
+    for scenario in scenarios:
+        breakdown = scenario.get("breakdown", "england")
+        if breakdown not in data:
+            data[breakdown] = annual_rows(load_breakdown(breakdown))
+        df = scenario_rows(scenario, data[breakdown])
+        for key, rows in (
+            (_fit_key(scenario, base=True), data[breakdown]),
+            (_fit_key(scenario), df),
+        ):
+            if key not in fits:
+                _, fits[key] = model_zoo.run_all(
+                    rows,
+                    horizon=key[1],
+                    models=list(key[2]) or None,
+                    workers=workers,
+                )
+    return data, fits
+
+
+def apply_adjustment(years, forecast, adjust):
+    """Compound a yearly multiplicative change onto a forecast."""
+    if not adjust:
+        return forecast
+    steps = np.clip(np.asarray(years) - adjust["from"] + 1, 0, None)
+    return forecast * (1 + adjust["rate"]) ** steps
+
+
+def run_scenario(scenario):
+    """Evaluate one scenario and return a long frame of its forecasts.
+
+    Baseline forecasts are matched to the scenario's by series and year, so a
+    scenario that excludes the latest years (and so forecasts from an earlier
+    year) has no baseline for the years the base fit does not cover.
+    """
+    breakdown = scenario.get("breakdown", "england")
+    series = scenario_rows(scenario, _DATA[breakdown])["level_description"].unique()
+    fits = _FITS[_fit_key(scenario)]
+    out = fits[fits["level_description"].isin(series)].copy()
+    out["forecast"] = apply_adjustment(
+        out["year_start"], out["forecast"].values, scenario.get("adjust")
+    )
+    base = _FITS[_fit_key(scenario, base=True)]
+    out = out.merge(
+        base[["level_description", "year_start", "forecast"]].rename(
+            columns={"forecast": "baseline"}
+        ),
+        on=["level_description", "year_start"],
+        how="left",
+    )
+    out.insert(0, "scenario", scenario["name"])
+    out.insert(1, "breakdown", breakdown)
+    return out
+
+
+def run_scenarios(scenarios, workers=None):
+    """Evaluate scenarios as a batch and return one comparative table.
+
+    The data and the fitted base models of each breakdown are prepared once
+    in the parent (fit_scenarios), as are the refits of scenarios with year
+    exclusions; scenarios are then evaluated across a process pool whose
+    workers receive those fits through the pool initializer.
+    """
+    data, fits = fit_scenarios(scenarios, workers=workers)
+    if workers == 1:
+        _init_worker(data, fits)
+        frames = list(map(run_scenario, scenarios))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(data, fits)
+        ) as pool:
+            frames = list(pool.map(run_scenario, scenarios))
+
+    table = pd.concat(frames, ignore_index=True)
+    table["change_vs_baseline_pct"] = (
+        (table["forecast"] - table["baseline"]) / table["baseline"] * 100
+    )
+    return table
+
+
+def load_scenarios(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    table = run_scenarios(EXAMPLE_SCENARIOS)
+    print(
+        table.pivot_table(
+            index=["scenario", "level_description"],
+            columns="year_start",
+            values="forecast",
+        )
+        .round(1)
+        .to_string()
+    )